@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import NamedTuple
+
+import orjson
+
+logger = getLogger(__name__)
+
+MAX_AGE = 7 * 24 * 60 * 60
+"""Seconds after which a cached page has to be checked for changes."""
+
+
+class CachedPage(NamedTuple):
+    html: str
+
+    validators: dict[str, str]
+    """Request headers to check whether the page has changed; see fetch_html()."""
+
+    stale: bool
+    """True if the page is older than MAX_AGE."""
+
+
+def cache_dir() -> Path:
+    """Directory that fetched pages are cached in."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "google-patents-scraper"
+
+
+def cache_path(url: str) -> Path:
+    """Path of the cache entry for the given URL."""
+    key = hashlib.sha1(url.encode()).hexdigest()
+    return cache_dir() / f"{key}.html"
+
+
+def read_cached_page(url: str) -> CachedPage | None:
+    """Cached page for the given URL, or None if it hasn't been cached."""
+    path = cache_path(url)
+    try:
+        html = path.read_text(encoding="utf-8")
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    try:
+        validators = orjson.loads(path.with_suffix(".json").read_bytes())
+    except FileNotFoundError:
+        # The page was fetched through a browser.
+        validators = {}
+    logger.info("Found cached HTML in %s", path)
+    return CachedPage(html, validators, stale=age > MAX_AGE)
+
+
+def write_cached_page(url: str, html: str, validators: dict[str, str]) -> None:
+    """Cache the HTML for the given URL, along with its validators."""
+    path = cache_path(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    validators_path = path.with_suffix(".json")
+    if validators:
+        write_atomically(validators_path, orjson.dumps(validators))
+    else:
+        validators_path.unlink(missing_ok=True)
+    # The page is written last, as its modification time is the entry's age.
+    write_atomically(path, html.encode())
+
+
+def write_atomically(path: Path, content: bytes) -> None:
+    """Write a file such that an interrupted write never leaves it truncated."""
+    # Write to a temporary file first and move it into place.
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+        f.write(content)
+    os.replace(f.name, path)
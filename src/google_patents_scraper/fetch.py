@@ -1,18 +1,118 @@
-import json
-import time
+import atexit
+import queue
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
 from logging import getLogger
 
+import httpx
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.wait import WebDriverWait
 
 logger = getLogger(__name__)
 
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
 
-def fetch_html(url: str) -> str:
-    """Fetch the source HTML of the given URL."""
 
-    # Client requires that we use content that is exactly identical to a human
-    # using "view-source:" as a prefix on a URL in Chrome.
+def http_client() -> httpx.AsyncClient:
+    """HTTP client for fetch_html()."""
+    return httpx.AsyncClient(
+        http2=True, headers={"User-Agent": USER_AGENT}, follow_redirects=True
+    )
+
+
+async def fetch_html(
+    url: str, client: httpx.AsyncClient, validators: dict[str, str] | None = None
+) -> tuple[str | None, dict[str, str]]:
+    """Fetch the source HTML of the given URL.
+
+    Client requires that we use content that is exactly identical to a human
+    using "view-source:" as a prefix on a URL in Chrome. Google Patents pages are
+    rendered server-side, and view-source: shows the unmodified response body,
+    so a plain HTTP request gets the same content without starting a browser.
+
+    The HTML is returned along with the validators of the response: request
+    headers that make a later fetch of the page conditional on it having
+    changed. If 'validators' from an earlier fetch are given and the page hasn't
+    changed since, None is returned instead of the HTML.
+    """
+    response = await client.get(url, headers=validators)
+    if response.status_code == httpx.codes.NOT_MODIFIED and validators:
+        return None, validators
+    response.raise_for_status()
+
+    new_validators = dict[str, str]()
+    if etag := response.headers.get("ETag"):
+        new_validators["If-None-Match"] = etag
+    if last_modified := response.headers.get("Last-Modified"):
+        new_validators["If-Modified-Since"] = last_modified
+    return response.text, new_validators
+
+
+idle_drivers = queue.SimpleQueue[webdriver.Chrome]()
+"""Chrome instances that aren't currently used by a fetch."""
+
+
+def start_driver() -> webdriver.Chrome:
+    """Start a headless Chrome instance that is quit when the process exits."""
+    options = Options()
+    options.add_argument("--headless=new")
+    # We only read the response of the page itself, so skip starting anything
+    # else that Chrome would normally run.
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+
+    logger.info("Starting Chrome.")
+    driver = webdriver.Chrome(options=options)
+    atexit.register(driver.quit)
+    return driver
+
+
+@contextmanager
+def borrow_driver() -> Iterator[webdriver.Chrome]:
+    """Borrow a Chrome instance for a single fetch.
+
+    Starting Chrome takes seconds, which dwarfs the time to fetch a single page,
+    so instances are returned to a pool after use and reused by later fetches.
+    A driver can't be shared between threads, so a new instance is started if
+    all existing ones are busy; the pool therefore grows to the number of
+    concurrent fetches.
+
+    If the fetch fails, the instance may have crashed or be left mid-load, so
+    it is quit instead of being returned to the pool.
+    """
+    try:
+        driver = idle_drivers.get_nowait()
+    except queue.Empty:
+        driver = start_driver()
+    try:
+        yield driver
+    except BaseException:
+        atexit.unregister(driver.quit)
+        with suppress(Exception):
+            driver.quit()
+        raise
+    idle_drivers.put(driver)
+
+
+def fetch_html_with_browser(url: str) -> str:
+    """Fetch the source HTML of the given URL through a headless browser.
+
+    This is much slower than fetch_html(), and is only needed if a page can't be
+    fetched without a browser.
+    """
+    with borrow_driver() as driver:
+        return fetch_html_with_driver(url, driver)
+
+
+def fetch_html_with_driver(url: str, driver: webdriver.Chrome) -> str:
+    """fetch_html_with_browser() using the given Chrome instance."""
+
+    # The content must match what "view-source:" shows; see fetch_html().
     #
     # We can't use the straightforward WebDriver.page_source property, as this
     # returns the _rendered_ HTML of the page (e.g. this would include all the
@@ -23,46 +123,41 @@ def fetch_html(url: str) -> str:
     # using experimental Chrome features, as Selenium doesn't have the ability
     # to interact with the native file dialog.
     #
-    # Instead, we intercept the network response by enabling performance logging
-    # and using the Chrome Developer Protocol to extract the logged response:
+    # Instead, we use the Chrome Developer Protocol to extract the network
+    # response of the page's document, similar to:
     # https://stackoverflow.com/a/77065745
-    options = Options()
-    options.add_argument("headless")
-    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
-    driver = webdriver.Chrome(options=options)
-    driver.get(f"view-source:{url}")
-
-    # Wait for page to finish loading
-    timeout = 5.0
-    start_time = time.time()
-    while driver.execute_script("return document.readyState") != "complete":  # type: ignore
-        elapsed = time.time() - start_time
-        if elapsed >= timeout:
-            raise TimeoutError(f"Page did not load within {timeout} seconds.")
-        logger.debug(f"Waiting for page to load, elapsed time: {elapsed}")
-        time.sleep(0.25)
-    logger.info("Page load complete.")
-
-    request_id = ""
-    # Find message containing the full response, which happens in the
-    # loadingFinished event. We use that message to lookup the request ID for
-    # our target response.
-    for entry in driver.get_log("performance"):  # type: ignore
-        message = json.loads(entry["message"])["message"]
-        if message["method"] == "Network.loadingFinished":
-            request_id = message["params"]["requestId"]
-            break
-
-    if not request_id:
-        raise RuntimeError(
-            "Could not find 'Network.loadingFinished' message in browser logs."
+    # Don't let state from previous fetches leak into this one.
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    driver.delete_all_cookies()
+    # The Network domain must be enabled for Chrome to keep response bodies. It is
+    # disabled again afterwards, which discards the kept bodies; otherwise a
+    # pooled browser would accumulate them over all of its fetches.
+    driver.execute_cdp_cmd("Network.enable", {})
+    try:
+        driver.get(f"view-source:{url}")
+
+        # driver.get() normally returns once the page has loaded, in which case this
+        # returns immediately without polling.
+        timeout = 5.0
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete",
+            f"Page did not load within {timeout} seconds.",
         )
-    # Fetch the response body:
-    # https://chromedevtools.github.io/devtools-protocol/tot/Network/#method-getResponseBody
-    response = driver.execute_cdp_cmd(
-        "Network.getResponseBody", {"requestId": request_id}
-    )
+        logger.info("Page load complete.")
+
+        # The request ID of a frame's document is the ID of the frame's loader, so
+        # we can look it up directly instead of scanning logged network events.
+        frame_tree = driver.execute_cdp_cmd("Page.getFrameTree", {})
+        request_id = frame_tree["frameTree"]["frame"]["loaderId"]
+        # Fetch the response body:
+        # https://chromedevtools.github.io/devtools-protocol/tot/Network/#method-getResponseBody
+        response = driver.execute_cdp_cmd(
+            "Network.getResponseBody", {"requestId": request_id}
+        )
+    finally:
+        driver.execute_cdp_cmd("Network.disable", {})
+
     if response["base64Encoded"]:
         # We raise an error because the documentation doesn't specify what kind
         # of base64 is used, and we haven't encountered this situation yet in
@@ -1,48 +1,166 @@
-import json
+import asyncio
 import logging
-from argparse import ArgumentParser
+import sys
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from pathlib import Path
 
-import rich
-from bs4 import Tag
-from rich import traceback
-from rich.logging import RichHandler
+import orjson
 
-from .scrape import scrape
+from .fetch import http_client
+from .parse import Node
+from .scrape import scrape_all
 
 
-def main() -> None:
-    rich.reconfigure(stderr=True)
-    log_handler = RichHandler(rich_tracebacks=True)
-    traceback.install(show_locals=True)
-    # Monkeypatch BS4 Tag to not take huge amounts of screen space in
-    # rich tracebacks.
-    setattr(Tag, "__repr__", lambda s: str(type(s)))
-
-    file_handler = logging.FileHandler("log.txt", mode="w")
+def read_patent_ids(path: Path) -> list[str]:
+    """Read patent IDs from a file with one ID per line.
+
+    Blank lines and lines starting with '#' are ignored."""
+    patent_ids = list[str]()
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            patent_ids.append(line)
+    return patent_ids
+
+
+def positive_int(value: str) -> int:
+    """Argument type for integers of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+async def scrape_patents(
+    patent_ids: list[str], args: Namespace
+) -> dict[str, list[Node]]:
+    async with http_client() as client:
+        return await scrape_all(
+            patent_ids,
+            client,
+            jobs=args.jobs,
+            render=args.render,
+            use_cache=not args.no_cache,
+        )
+
+
+def setup_logging(verbose: bool, log_file: Path | None) -> None:
+    """Log warnings to stderr, or everything if 'verbose' is set.
+
+    Verbose logs and tracebacks are formatted with rich. This is only imported
+    when needed, as importing it takes a noticeable part of startup time."""
+    handlers = list[logging.Handler]()
+    if verbose:
+        import rich
+        from rich import traceback
+        from rich.logging import RichHandler
+
+        rich.reconfigure(stderr=True)
+        handlers.append(RichHandler(rich_tracebacks=True))
+        traceback.install(show_locals=True)
+    else:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, mode="w"))
     logging.basicConfig(
-        level="NOTSET",
-        format="%(message)s",
+        level="NOTSET" if verbose else "WARNING",
+        format="%(message)s" if verbose else "%(levelname)s: %(message)s",
         datefmt="[%X]",
-        handlers=[log_handler, file_handler],
+        handlers=handlers,
     )
     # for handler in logging.getLogger().handlers:
     #     handler.addFilter(logging.Filter("patent"))
 
+
+def main() -> None:
     parser = ArgumentParser(
         description="Fetch JSON-encoded information about a patent."
     )
     parser.add_argument(
         "id",
         type=str,
-        help=("The Google Patent ID to fetch data for. "),
+        nargs="*",
+        help=(
+            "The Google Patent IDs to fetch data for. If more than one is given, "
+            "the output is an object mapping each ID to its data."
+        ),
+    )
+    parser.add_argument(
+        "--input-file",
+        type=Path,
+        help=(
+            "File listing more Google Patent IDs to fetch data for, one per line. "
+            "The output is then an object mapping each ID to its data."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=4,
+        help=(
+            "Maximum number of patents to fetch concurrently, and of headless "
+            "browsers to run."
+        ),
+    )
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="Fetch pages through a headless Chrome browser instead of plain HTTP.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always fetch pages instead of reusing previously fetched pages.",
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Syntax-highlight the JSON output. Much slower for large outputs.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log progress and debugging information, not just warnings.",
+    )
+    parser.add_argument(
+        "--log-file",
+        type=Path,
+        help="File to also write the log to.",
     )
     args = parser.parse_args()
+    setup_logging(args.verbose, args.log_file)
+    patent_ids = list(args.id)
+    if args.input_file:
+        try:
+            patent_ids += read_patent_ids(args.input_file)
+        except OSError as e:
+            parser.error(f"Could not read --input-file: {e}")
+    if not patent_ids:
+        parser.error("No patent IDs given.")
+    # The data of a single ID given on the command line is output unwrapped.
+    batch = args.input_file is not None or len(args.id) > 1
+    # Drop duplicates, keeping the order.
+    patent_ids = list(dict.fromkeys(patent_ids))
+
+    scraped = asyncio.run(scrape_patents(patent_ids, args))
+    for translations in scraped.values():
+        for translation in translations:
+            # Remove raw HTML when outputting JSON
+            translation.pop("html")
+    if not batch and not scraped:
+        # The failure has already been logged.
+        sys.exit(1)
+    output = scraped if batch else scraped[patent_ids[0]]
+    if args.pretty:
+        from rich.console import Console
 
-    scraped = scrape(args.id)
-    for translation in scraped:
-        # Remove raw HTML when outputting JSON
-        translation.pop("html")
-    print(json.dumps(scraped, indent=2))
+        # The global rich console may have been set to write to stderr.
+        Console().print_json(data=output)
+    else:
+        sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+        sys.stdout.buffer.write(b"\n")
+    if len(scraped) < len(patent_ids):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
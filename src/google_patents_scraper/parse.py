@@ -1,75 +1,100 @@
+import re
+import sys
 from collections.abc import Iterator
+from functools import lru_cache
 from logging import getLogger
 from typing import Any, TypeAlias
 
-from bs4 import BeautifulSoup, NavigableString, Tag
+import lxml.html
+from lxml import etree
 
 Field: TypeAlias = tuple[str, Any]
 FieldIterator: TypeAlias = Iterator[Field]
 Node: TypeAlias = dict[str, Any]
+Tag: TypeAlias = etree._Element
 
 logger = getLogger(__name__)
 
 # We define a 'property' as an HTML tag with an 'itemprop' attribute.
 
+# Attributes are tested with tag.get(name) rather than 'name in tag.attrib':
+# lxml builds a new proxy object on every access to tag.attrib.
+
 
 def tag_string(tag: Tag) -> str:
     """Human-readable tag information for logging."""
-    return f"{tag.name=} {tag.attrs=} {tag.sourceline=}"
+    return f"{tag.tag=} {tag.attrib=} {tag.sourceline=}"
+
+
+def has_class(class_name: str) -> str:
+    """XPath predicate that is true if 'class_name' is one of a tag's classes"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def tag_text(tag: Tag) -> str | None:
+    """The text of a tag whose only content is a single string.
+
+    Nested tags are followed as long as each has exactly one child. This
+    mirrors BeautifulSoup's Tag.string, which we originally relied on.
+    """
+    while len(tag) != 0:
+        if len(tag) > 1 or tag.text or tag[0].tail:
+            return None
+        tag = tag[0]
+    return tag.text
+
+
+TEXT_XPATH = etree.XPath("descendant::text()", smart_strings=False)
+"""Finds the text within a tag, excluding comments.
+
+This is several times faster than Tag.itertext()."""
+
+
+def stripped_strings(tag: Tag) -> list[str]:
+    """The non-empty text within a tag, stripped of whitespace.
+
+    Comments are excluded."""
+    texts = TEXT_XPATH(tag)
+    assert isinstance(texts, list)
+    return [stripped for text in texts if (stripped := str(text).strip())]
 
 
-def has_class(tag: Tag, class_name: str) -> bool:
-    """True if 'class_name' is one of tag's classes"""
-    classes = tag.get("class") or []
-    return class_name in classes
+def get_text(tag: Tag) -> str:
+    """All the text within a tag, with each string stripped of whitespace."""
+    return "".join(stripped_strings(tag))
 
 
+@lru_cache(maxsize=512)
 def hyphenated_to_camel(hyphenated: str) -> str:
     """Convert hyphenated-string to camelCased string."""
-    parts = list[str]()
-    for i, part in enumerate(hyphenated.split("-")):
-        if i != 0:
-            part = part.capitalize()
-        parts.append(part)
-    return "".join(parts)
+    first, *rest = hyphenated.split("-")
+    return sys.intern(first + "".join(map(str.capitalize, rest)))
 
 
 def parse_html(html: str) -> Node:
     """Parse HTML string"""
-    hack.clear()
-
-    soup = BeautifulSoup(html, features="html.parser")
-    article = soup.find("article")
-    if not isinstance(article, Tag):
+    # We walk lxml's tree directly: BeautifulSoup's Python wrapper around every
+    # node was the dominant cost of parsing.
+    root = lxml.html.document_fromstring(html)
+    article = root.find(".//article")
+    if article is None:
         raise ValueError("Could not find <article> tag. Maybe the URL is wrong?")
 
     data: Node = {}
-    parse_properties(article, data)
-
-    hack.clear()
-    # Special sections get incorrectly nested under the "links" property. Remove
-    # these properties to move them to the proper location, and also to
-    # specialize their handling.
-    #
-    # TODO(dhrosa): Figure out how to avoid these nesting under "links". Perhaps
-    # pre-process the HTML to nest the special sections under a new synthethic
-    # property.
-    if links := data.get("links"):
-        for name in SPECIAL_SECTION_NAMES:
-            if name in links:
-                del links[name]
-    parse_special_sections(article, data)
+    # Special sections are found while parsing the other properties, but are
+    # parsed separately, as their structure isn't represented as properties.
+    special_sections = list[Tag]()
+    parse_children_properties(article, data, special_sections)
+    parse_special_sections(special_sections, data)
 
     data["parsedPublicationNumbers"] = list(parse_publication_numbers(article))
     return data
 
 
-hack = set[int]()
-
 START_TAGS = ("dt", "h2")
 
 
-def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
+def parse_properties(tag: Tag, current_node: Node) -> None:
     """Recursively parse properties.
 
     We skip over tags that are not related to a property.
@@ -77,11 +102,8 @@ def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
     <dt> and <h2> tags are used as labels that delineate properties. Nodes
     between these tags relate to the previous label.
     """
-    if id(tag) in hack:
-        return
-    hack.add(id(tag))
     child_node: Node
-    if tag.name in START_TAGS:
+    if tag.tag in START_TAGS:
         # New label found; begin a new nested node
         label = parse_label(tag)
         child_node = {}
@@ -96,9 +118,15 @@ def parse_properties(tag: Tag, current_node: Node) -> None:  # noqa: C901
         return
     assert isinstance(property_name, str)
 
-    value = property_value(tag)
+    add_property(tag, property_name, property_value(tag), current_node)
 
-    if tag.has_attr("repeat"):
+
+def add_property(tag: Tag, property_name: str, value: Any, current_node: Node) -> None:
+    """Add the value of a property tag to a node."""
+    # The same few property names are used by many tags on every page, so all
+    # the nodes share a single copy of each.
+    property_name = sys.intern(property_name)
+    if tag.get("repeat") is not None:
         # "repeat" attribute indicate list-valued properties
         if property_name not in current_node:
             current_node[property_name] = []
@@ -112,7 +140,7 @@ def property_value(tag: Tag) -> Any:
     """Parse value of a property tag.
 
     Dependent on the type of tag, the interesting content of the tag"""
-    if tag.has_attr("itemscope"):
+    if tag.get("itemscope") is not None:
         # Nested property
         child_node: Node = {}
         parse_children_properties(tag, child_node)
@@ -127,11 +155,11 @@ def property_value(tag: Tag) -> Any:
         # <img> tags
         return src
     # Otherwise, the text within the node is considered the value
-    text = tag.string
-    if not isinstance(text, str):
+    text = tag_text(tag)
+    if text is None:
         #
         logger.warning(
-            f"Omitting property value for tag with nested content: {tag_string(tag)}"
+            "Omitting property value for tag with nested content: %s", tag_string(tag)
         )
         return None
     return text.strip()
@@ -139,92 +167,169 @@ def property_value(tag: Tag) -> Any:
 
 def attrs_to_fields(tag: Tag) -> FieldIterator:
     """Convert all HTML attributes of a tag into fields except for 'class'."""
-    for key, value in tag.attrs.items():
+    for key, value in tag.attrib.items():
+        assert isinstance(key, str)
         if key != "class":
             yield hyphenated_to_camel(key), value
 
 
+LABEL_WORDS_RE = re.compile(r"(?:[^\W_]\S*\s*)*")
+"""Matches the leading words of a label that start with an alphanumeric."""
+
+
 def parse_label(tag: Tag) -> str:
-    """Convert a label (e.g. an h2 tag) into camel case."""
-    raw = tag.string
-    if not isinstance(raw, str):
+    """Convert a label (e.g. an h2 tag) into camel case.
+
+    See label_to_camel()."""
+    raw = tag_text(tag)
+    if raw is None:
         logger.warning("Label tag has no string")
         return ""
-    raw = raw.strip()
-
-    parts = list[str]()
-    for i, part in enumerate(raw.split()):
-        if not part[0].isalnum():
-            break
-        if i == 0:
-            parts.append(part.lower())
-        else:
-            parts.append(part.capitalize())
-    return "".join(parts)
+    return label_to_camel(raw)
+
+
+@lru_cache(maxsize=512)
+def label_to_camel(raw: str) -> str:
+    """Convert the text of a label into camel case.
+
+    Words following the first word that doesn't start with an alphanumeric
+    character are ignored."""
+    match = LABEL_WORDS_RE.match(raw.strip())
+    assert match is not None
+    words = match.group().split()
+    if not words:
+        return ""
+    return sys.intern(words[0].lower() + "".join(map(str.capitalize, words[1:])))
 
 
-def parse_children_properties(tag: Tag, current_node: Node) -> None:
-    """Parse properties from all child tags"""
-    for child in tag.children:
-        if not isinstance(child, Tag):
+PROPERTY_TAGS_XPATH = etree.XPath(
+    "descendant::*[@itemprop or self::dt or self::h2]"
+    "[not(ancestor::*[self::dt or self::h2 or (@itemprop != '' and not(@itemscope))])]"
+)
+"""Finds the property and label tags under a tag, in document order.
+
+The content of labels and of properties without nested properties is not
+parsed, so tags within them are excluded. Tags with an empty 'itemprop' are
+included, although they aren't properties: testing for a non-empty attribute
+makes the query noticeably slower, and such tags are rare."""
+
+
+def parse_children_properties(  # noqa: C901
+    tag: Tag, current_node: Node, special_sections: list[Tag] | None = None
+) -> None:
+    """Parse properties from all child tags
+
+    This is equivalent to calling parse_properties() on each child, but only
+    visits the tags that are properties or labels rather than recursing through
+    every tag in the subtree.
+
+    If 'special_sections' is given, special sections are appended to it instead
+    of being parsed as properties; see parse_special_sections()."""
+    # The node that the properties of each tag's children are parsed into.
+    child_nodes: dict[Tag, Node] = {tag: current_node}
+    # The node of the most recent label among each tag's children.
+    label_nodes: dict[Tag, Node] = {}
+
+    def children_node(parent: Tag) -> Node:
+        """The node that a tag's child properties are parsed into, ignoring labels."""
+        node = child_nodes.get(parent)
+        if node is None:
+            # Tags that aren't properties pass their node on to their children.
+            grandparent = parent.getparent()
+            assert grandparent is not None
+            node = label_nodes.get(grandparent)
+            if node is None:
+                node = children_node(grandparent)
+            child_nodes[parent] = node
+        return node
+
+    properties = PROPERTY_TAGS_XPATH(tag)
+    assert isinstance(properties, list)
+    for child in properties:
+        assert isinstance(child, etree._Element)
+        parent = child.getparent()
+        assert parent is not None
+        if child.tag in START_TAGS:
+            # New label found; begin a new nested node
+            label_node: Node = {}
+            children_node(parent)[parse_label(child)] = label_node
+            label_nodes[parent] = label_node
             continue
-        parse_properties(child, current_node)
+
+        # Tags following a label belong to the label's node.
+        node = label_nodes.get(parent)
+        if node is None:
+            node = children_node(parent)
+        property_name = child.get("itemprop")
+        if not property_name:
+            continue
+        value: Any
+        if child.get("itemscope") is None:
+            value = property_value(child)
+        elif (
+            special_sections is not None
+            and child.tag == "section"
+            and property_name in SPECIAL_SECTION_NAMES
+        ):
+            special_sections.append(child)
+            # The section's properties are parsed into a node that is discarded.
+            # This still finds any special sections nested within it.
+            child_nodes[child] = {}
+            if node is not current_node:
+                continue
+            # Reserve the section's key so that it keeps its position.
+            value = None
+        else:
+            # Nested property; its children are found later in the loop.
+            value = child_nodes[child] = {}
+        add_property(child, property_name, value, node)
 
 
 def parse_siblings_properties(tag: Tag, current_node: Node) -> None:
     """Parse properties from all sibling tags"""
-    for sibling in tag.next_siblings:
-        if not isinstance(sibling, Tag):
-            continue
-        if sibling.name in START_TAGS:
+    for sibling in tag.itersiblings(etree.Element):
+        if sibling.tag in START_TAGS:
             return
         parse_properties(sibling, current_node)
 
 
 def parse_publication_numbers(article: Tag) -> Iterator[str]:
-    start = article.find(attrs={"itemprop": "publicationNumber"})
-    if not isinstance(start, Tag):
+    start = article.find('.//*[@itemprop="publicationNumber"]')
+    if start is None:
         logger.warning("Could not find publication numbers.")
         return
 
-    for sibling in start.next_siblings:
-        if not isinstance(sibling, Tag):
-            continue
-        if sibling.name in START_TAGS:
+    # Only the <span> tags up to the next label are of interest.
+    for sibling in start.itersiblings("span", *START_TAGS):
+        if sibling.tag in START_TAGS:
             return
-        if sibling.name != "span":
-            continue
-        text = sibling.get_text(strip=True)
+        text = get_text(sibling)
         if text:
             yield text
 
 
-SPECIAL_SECTION_NAMES = (
-    "abstract",
-    "description",
-    "claims",
-    "application",
-    "family",
+SPECIAL_SECTION_NAMES = frozenset(
+    {
+        "abstract",
+        "description",
+        "claims",
+        "application",
+        "family",
+    }
 )
 """itemprop value of <section> tags that need specialized handling."""
 
 
-def is_special_section(tag: Tag) -> bool:
-    """True if this is a <section> tag that needs specialized handling."""
-    return (
-        tag.name == "section"
-        and tag.has_attr("itemscope")
-        and (tag.get("itemprop") in SPECIAL_SECTION_NAMES)
-    )
-
-
-def parse_special_sections(article: Tag, current_node: Node) -> None:
+def parse_special_sections(sections: list[Tag], current_node: Node) -> None:
     """Parse section tags that are also properties.
 
-    These tags have special structure that is not represented as properties."""
-    for section in article.find_all(is_special_section):
-        property_name = section["itemprop"]
+    These tags have special structure that is not represented as properties.
+    Each section is parsed into 'current_node', whichever property it is nested
+    in."""
+    for section in sections:
+        property_name = section.get("itemprop")
         assert isinstance(property_name, str)
+        property_name = sys.intern(property_name)
         value: Any
         match property_name:
             case "abstract":
@@ -238,29 +343,31 @@ def parse_special_sections(article: Tag, current_node: Node) -> None:
             case "family":
                 value = dict(parse_family(section))
             case _:
-                logger.warning(f"Unhandled section: {section.attrs=}")
+                logger.warning("Unhandled section: section.attrib=%r", section.attrib)
                 value = None
         current_node[property_name] = value
 
 
 def parse_abstract(section: Tag) -> FieldIterator:
     """Parse abstract section"""
-    abstract = section.find("abstract")
-    if not isinstance(abstract, Tag):
+    abstract = section.find(".//abstract")
+    if abstract is None:
         return
 
     yield from attrs_to_fields(abstract)
-    yield "text", abstract.get_text(strip=True)
+    yield "text", get_text(abstract)
 
 
-def parse_description(section: Tag) -> FieldIterator:
-    """Parse description section"""
+DESCRIPTION_XPATH = etree.XPath(
+    f"descendant::*[self::description or {has_class('description')}][1]"
+)
+"""Finds the tag containing the description within its section."""
 
-    def is_description(tag: Tag) -> bool:
-        return has_class(tag, "description") or (tag.name == "description")
 
-    description = section.find(is_description)
-    if not isinstance(description, Tag):
+def parse_description(section: Tag) -> FieldIterator:
+    """Parse description section"""
+    description = find_first(DESCRIPTION_XPATH, section)
+    if description is None:
         return
 
     yield from attrs_to_fields(description)
@@ -268,50 +375,61 @@ def parse_description(section: Tag) -> FieldIterator:
     yield "lines", list(parse_description_lines(description))
 
 
-def descendant_navigable_strings(tag: Tag) -> Iterator[NavigableString]:
-    """Iterates through NavigableString descendants of the given tag."""
-    for d in tag.descendants:
-        if isinstance(d, NavigableString):
-            yield d
+def find_first(xpath: etree.XPath, tag: Tag) -> Tag | None:
+    """The first tag found by evaluating 'xpath' on 'tag'."""
+    found = xpath(tag)
+    assert isinstance(found, list)
+    if not found:
+        return None
+    assert isinstance(found[0], etree._Element)
+    return found[0]
 
 
 def parse_description_lines(description: Tag) -> Iterator[Node]:
-    """Parse individual text elements inside the description section."""
-
-    def get_line_num(s: NavigableString) -> str:
-        """Fetches the "num" attribute of the nearest ancestor."""
-        for parent in s.parents:
-            if num := parent.get("num"):
-                assert isinstance(num, str)
-                return num
-        return ""
+    """Parse individual text elements inside the description section.
+
+    Each line is numbered by the "num" attribute of the nearest tag containing
+    it. Text inside comments is included."""
+    # The line number within each open tag, innermost last. Tracking these
+    # while walking the tree saves searching the ancestors of every string.
+    nums = [next((n for a in description.iterancestors() if (n := a.get("num"))), "")]
+    events = ("start", "end", "comment", "pi")
+    for event, tag in etree.iterwalk(description, events=events):
+        match event:
+            case "start":
+                nums.append(tag.get("num") or nums[-1])
+                strings = [tag.text]
+            case "end":
+                nums.pop()
+                # The description's own tail is outside of it.
+                strings = [tag.tail] if tag is not description else []
+            case _:
+                strings = [tag.text, tag.tail]
+        for string in strings:
+            if string and (text := string.strip()):
+                yield {"num": nums[-1], "text": text}
 
-    for d in descendant_navigable_strings(description):
-        text = str(d).strip()
-        if not text:
-            continue
-        yield {"num": get_line_num(d), "text": text}
 
+CLAIMS_XPATH = etree.XPath(f"descendant::*[self::claims or {has_class('claims')}][1]")
+"""Finds the tag containing the claims within their section."""
 
-def parse_claims(section: Tag) -> FieldIterator:
-    """Parse claims section"""
+CLAIM_XPATH = etree.XPath(f"descendant::*[self::claim or {has_class('claim')}][@num]")
+"""Finds the tags of the individual claims, in document order."""
 
-    def is_claims(tag: Tag) -> bool:
-        return has_class(tag, "claims") or tag.name == "claims"
 
-    claims_tag = section.find(is_claims)
-    if not isinstance(claims_tag, Tag):
+def parse_claims(section: Tag) -> FieldIterator:
+    """Parse claims section"""
+    claims_tag = find_first(CLAIMS_XPATH, section)
+    if claims_tag is None:
         return
 
     yield from attrs_to_fields(claims_tag)
 
     parsed_claims = list[Node]()
-
-    def is_claim(tag: Tag) -> bool:
-        return (has_class(tag, "claim") or tag.name == "claim") and tag.has_attr("num")
-
-    for claim in claims_tag.find_all(is_claim):
-        assert isinstance(claim, Tag)
+    claims = CLAIM_XPATH(claims_tag)
+    assert isinstance(claims, list)
+    for claim in claims:
+        assert isinstance(claim, etree._Element)
         parsed_claims.append(dict(parse_claim(claim)))
 
     yield "claims", parsed_claims
@@ -320,7 +438,7 @@ def parse_claims(section: Tag) -> FieldIterator:
 def parse_claim(claim: Tag) -> FieldIterator:
     """Parse a single claim"""
     yield from attrs_to_fields(claim)
-    yield "text", list(claim.stripped_strings)
+    yield "text", stripped_strings(claim)
 
 
 def parse_application(application: Tag) -> FieldIterator:
@@ -333,13 +451,13 @@ def parse_application(application: Tag) -> FieldIterator:
 def parse_family(family: Tag) -> FieldIterator:
     """Parse family section."""
     # The ID of the family is contained in its first h2 tag.
-    id_tag = family.find("h2")
-    if not isinstance(id_tag, Tag):
+    id_tag = family.find(".//h2")
+    if id_tag is None:
         return
-    yield "id", id_tag.get_text(strip=True).split("=")[-1]
+    yield "id", get_text(id_tag).split("=")[-1]
 
-    content_start = id_tag.find_next_sibling("h2")
-    if not isinstance(content_start, Tag):
+    content_start = next(id_tag.itersiblings("h2"), None)
+    if content_start is None:
         return
 
     node: Node = {}
@@ -1,6 +1,16 @@
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
 from logging import getLogger
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.queues import Queue
 
-from .fetch import fetch_html
+import httpx
+
+from .cache import read_cached_page, write_cached_page
+from .fetch import fetch_html, fetch_html_with_browser
 from .parse import Node, parse_html
 
 logger = getLogger(__name__)
@@ -11,21 +21,96 @@ def patent_url(patent_id: str, language: str) -> str:
     return f"https://patents.google.com/patent/{patent_id}/{language}"
 
 
-def scrape(patent_id: str) -> list[Node]:
+async def fetch_page(
+    url: str,
+    client: httpx.AsyncClient,
+    render: bool,
+    use_cache: bool,
+    browsers: asyncio.Semaphore,
+) -> str:
+    """Fetch the HTML of a page for scrape().
+
+    Unless 'use_cache' is false, a cached page is used if there is one. Once it
+    is older than MAX_AGE, it is only downloaded again if it has changed."""
+    cached = read_cached_page(url) if use_cache else None
+    if cached is not None and not cached.stale:
+        return cached.html
+
+    validators = cached.validators if cached is not None else None
+    html, validators = await download_page(url, client, render, browsers, validators)
+    if html is None:
+        assert cached is not None
+        logger.info("Cached HTML of %s is still current.", url)
+        html = cached.html
+    if use_cache:
+        write_cached_page(url, html, validators)
+    return html
+
+
+async def download_page(
+    url: str,
+    client: httpx.AsyncClient,
+    render: bool,
+    browsers: asyncio.Semaphore,
+    validators: dict[str, str] | None,
+) -> tuple[str | None, dict[str, str]]:
+    """fetch_html(), but through a headless browser if 'render' is set or if
+    'client' is denied access.
+
+    Each browser fetch holds 'browsers' while it runs. As every concurrent fetch
+    needs its own Chrome instance, this bounds the number of instances started.
+    Browser fetches are never conditional, and have no validators."""
+    if not render:
+        try:
+            return await fetch_html(url, client, validators)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != httpx.codes.FORBIDDEN:
+                raise
+            # Plain HTTP requests are sometimes refused where a browser isn't.
+            logger.warning("Access to %s denied; retrying with a browser.", url)
+    async with browsers:
+        return await asyncio.to_thread(fetch_html_with_browser, url), {}
+
+
+async def parse_page(html: str, pool: Executor | None) -> Node:
+    """Parse a page with parse_html(), in 'pool' if one is given."""
+    if pool is None:
+        return parse_html(html)
+    return await asyncio.get_running_loop().run_in_executor(pool, parse_html, html)
+
+
+async def scrape(
+    patent_id: str,
+    client: httpx.AsyncClient,
+    render: bool = False,
+    use_cache: bool = True,
+    parse_pool: Executor | None = None,
+    browsers: asyncio.Semaphore | None = None,
+) -> list[Node]:
     """Scrape information for the given patent ID.
 
-    We produce one element for every language the patent is available in.
+    We produce one element for every language the patent is available in. The
+    translations are fetched concurrently once the original page is parsed.
+
+    Pages are fetched with 'client', or through a headless browser if 'render'
+    is set. Unless 'use_cache' is false, fetched pages are cached on disk and
+    reused by later scrapes. Pages are parsed in 'parse_pool' if one is given.
+    Up to one page at a time is fetched through a browser, or as many as
+    'browsers' allows if it is given.
     """
+    if browsers is None:
+        browsers = asyncio.Semaphore(1)
+
     original_url = patent_url(patent_id, "")
-    logger.info(f"Parsing patent in its original language: {original_url}")
+    logger.info("Parsing patent in its original language: %s", original_url)
     # Fetch patent HTML for the original language.
-    original_html = fetch_html(original_url)
-    original = parse_html(original_html)
+    original_html = await fetch_page(original_url, client, render, use_cache, browsers)
+    original = await parse_page(original_html, parse_pool)
     try:
         original_language = original["abstract"]["lang"].lower()
     except KeyError:
         original_language = "<unknown>"
-    logger.info(f"Original language is {original_language!r}")
+    logger.info("Original language is %r", original_language)
 
     # Figure out what translations are available. Single-language patents won't
     # have an 'otherLanguages' attribute.
@@ -33,18 +118,107 @@ def scrape(patent_id: str) -> list[Node]:
     for other in original.get("otherLanguages", {}).get("otherLanguages", []):
         other_languages.append(other["code"])
 
-    logger.info(f"Other languages available: {other_languages}")
+    logger.info("Other languages available: %s", other_languages)
 
     parsed = list[Node]()
     parsed.append(
         {"language": original_language, "data": original, "html": original_html}
     )
 
-    for language in other_languages:
+    async def scrape_translation(language: str) -> Node:
         url = patent_url(patent_id, language)
-        logger.info(f"Fetching {language!r} translation: {url}")
-        html = fetch_html(url)
-        parsed.append({"language": language, "data": parse_html(html), "html": html})
+        logger.info("Fetching %r translation: %s", language, url)
+        html = await fetch_page(url, client, render, use_cache, browsers)
+        data = await parse_page(html, parse_pool)
+        return {"language": language, "data": data, "html": html}
+
+    # Translations are fetched concurrently; gather() keeps them in order.
+    parsed.extend(
+        await asyncio.gather(*(scrape_translation(lang) for lang in other_languages))
+    )
 
     logger.info("Scrape completed.")
     return parsed
+
+
+async def scrape_all(
+    patent_ids: list[str],
+    client: httpx.AsyncClient,
+    jobs: int,
+    render: bool = False,
+    use_cache: bool = True,
+) -> dict[str, list[Node]]:
+    """Scrape information for each of the given patent IDs.
+
+    Up to 'jobs' patents are scraped concurrently, and up to 'jobs' pages are
+    fetched through a browser at a time. The other arguments are passed on to
+    scrape().
+
+    A patent that fails to be scraped is logged and left out of the result, so
+    that it doesn't discard the results of the other patents.
+    """
+    semaphore = asyncio.Semaphore(jobs)
+    # Translations are fetched concurrently, so patents are not enough to bound
+    # the number of browsers.
+    browsers = asyncio.Semaphore(jobs)
+
+    async def scrape_one(
+        patent_id: str, parse_pool: Executor | None
+    ) -> list[Node] | None:
+        async with semaphore:
+            try:
+                return await scrape(
+                    patent_id,
+                    client,
+                    render=render,
+                    use_cache=use_cache,
+                    parse_pool=parse_pool,
+                    browsers=browsers,
+                )
+            except Exception:
+                logger.exception("Failed to scrape patent %s.", patent_id)
+                return None
+
+    with contextlib.ExitStack() as stack:
+        # Parsing is CPU-bound, so pages are parsed in worker processes to run in
+        # parallel with each other. Starting the workers takes longer than
+        # parsing a single patent, though.
+        parse_pool = None
+        if len(patent_ids) > 1:
+            parse_pool = start_parse_pool(stack)
+        scraped = await asyncio.gather(*(scrape_one(p, parse_pool) for p in patent_ids))
+    return {
+        patent_id: translations
+        for patent_id, translations in zip(patent_ids, scraped)
+        if translations is not None
+    }
+
+
+def start_parse_pool(stack: contextlib.ExitStack) -> Executor:
+    """Start worker processes for parse_page(), which are shut down by 'stack'.
+
+    The log records of the workers are handled by the handlers of this process's
+    root logger."""
+    # Workers are started while fetches are running in other threads, so they
+    # must not be forked from this process.
+    context = multiprocessing.get_context("spawn")
+    log_queue: Queue[logging.LogRecord] = context.Queue()
+    root = logging.getLogger()
+    listener = QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    listener.start()
+    # Stopped after the pool has shut down, so that no records are lost.
+    stack.callback(listener.stop)
+    return stack.enter_context(
+        ProcessPoolExecutor(
+            mp_context=context,
+            initializer=init_parse_worker,
+            initargs=(log_queue, root.level),
+        )
+    )
+
+
+def init_parse_worker(log_queue: "Queue[logging.LogRecord]", level: int) -> None:
+    """Send the log records of a parse worker to 'log_queue'."""
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)